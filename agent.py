@@ -1,31 +1,56 @@
 """Deep Research ADK Agent - Simplified implementation supporting ADK CLI, A2A Server, and Agent Engine."""
 
+import asyncio
 import os
 import logging
+import time
 import warnings
 from typing import Dict, Any, Optional
+from urllib.parse import urlparse
 
 from dotenv import load_dotenv
 
-load_dotenv()
+# Load .env once per process without overriding explicitly-set environment;
+# workers and tests can skip the filesystem scan with ADK_LOAD_DOTENV=0.
+if os.environ.get("ADK_LOAD_DOTENV", "1") == "1" and not os.environ.get("_DOTENV_LOADED"):
+    load_dotenv(override=False)
+    os.environ["_DOTENV_LOADED"] = "1"
 
 # Configure logging
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get("LOG_LEVEL", "INFO"),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger("deep_research_agent")
 
-# Suppress ADK experimental warnings
-warnings.filterwarnings("ignore", category=UserWarning, module="google.adk")
-
 from google import genai
-from google.adk.agents import Agent
-from google.adk.tools import ToolContext
-from google.adk.models.google_llm import Gemini
-from google.adk.a2a.utils.agent_to_a2a import to_a2a
+
+# Suppress ADK experimental warnings only around the ADK call sites rather
+# than installing a process-wide filter, which slows every warnings.warn in
+# the process and hides other libraries' warnings.
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", UserWarning)
+    from google.adk.agents import Agent
+    from google.adk.tools import ToolContext
+    from google.adk.models.google_llm import Gemini
+    from google.adk.a2a.utils.agent_to_a2a import to_a2a
 
 MAX_POLL_SECONDS = 900  # 15 minutes
+POLL_INITIAL_DELAY = 0.5  # seconds; grows exponentially up to POLL_MAX_DELAY
+POLL_MAX_DELAY = 30
+POLL_BACKOFF_FACTOR = 1.5
+POLL_MAX_RETRIES = 6  # consecutive transient poll failures before giving up
+POLL_LOG_INTERVAL = 30.0  # seconds between progress logs for an unchanged status
+MAX_RESEARCH_SESSIONS = 64  # research_sessions registry cap; oldest evicted first
+MAX_CACHED_RESULTS = 64  # completed interactions kept for timed-out waiters to resume
+
+_TERMINAL_STATES = ("COMPLETED", "FAILED", "completed", "failed")
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Whether an API error is worth retrying (rate limited or server-side)."""
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return code == 429 or (isinstance(code, int) and 500 <= code < 600)
 
 
 def _get_api_key() -> str:
@@ -33,13 +58,30 @@ def _get_api_key() -> str:
     return os.environ.get("GEMINI_API_KEY")
 
 
+_client: Optional[genai.Client] = None
+
+
+def _get_client(api_key: str) -> genai.Client:
+    """Return a shared GenAI client, constructed once per process.
+
+    Reusing one client keeps the underlying HTTP connection pool warm across
+    tool calls instead of paying TLS handshake + pool setup per invocation.
+    """
+    global _client
+    if _client is None:
+        # Deep Research requires AI Studio endpoint (not Vertex AI)
+        logger.info("[DEEP_RESEARCH] Creating genai client...")
+        _client = genai.Client(api_key=api_key, vertexai=False, http_options={"api_version": "v1beta"})
+    return _client
+
+
 def _extract_text(report) -> str:
     """Extract text content from a Deep Research interaction report."""
     # Try common output locations
     if hasattr(report, "output") and report.output:
         return str(report.output)
     if hasattr(report, "parts"):
-        texts = [p.text for p in report.parts if hasattr(p, "text") and p.text]
+        texts = [t for p in report.parts if (t := getattr(p, "text", None))]
         if texts:
             return "\n".join(texts)
     if hasattr(report, "result") and report.result:
@@ -47,10 +89,11 @@ def _extract_text(report) -> str:
     if hasattr(report, "outputs") and report.outputs:
         texts = []
         for out in report.outputs:
-            if hasattr(out, "text") and out.text:
-                texts.append(out.text)
-            elif isinstance(out, dict) and "text" in out:
-                texts.append(out["text"])
+            text = getattr(out, "text", None)
+            if text is None and isinstance(out, dict):
+                text = out.get("text")
+            if text:
+                texts.append(text)
         if texts:
             return "\n".join(texts)
     # Fallback: try model_dump
@@ -65,6 +108,127 @@ def _extract_text(report) -> str:
     return "No text content found in report."
 
 
+async def _interactions_create(client: genai.Client, **kwargs):
+    """Create an interaction without blocking the event loop.
+
+    Prefers the SDK's async surface (client.aio) when it exposes
+    interactions; otherwise runs the sync call in a worker thread.
+    """
+    aio = getattr(client, "aio", None)
+    if aio is not None and hasattr(aio, "interactions"):
+        return await aio.interactions.create(**kwargs)
+    return await asyncio.to_thread(client.interactions.create, **kwargs)
+
+
+async def _interactions_get(client: genai.Client, interaction_id: str):
+    """Fetch an interaction without blocking the event loop."""
+    aio = getattr(client, "aio", None)
+    if aio is not None and hasattr(aio, "interactions"):
+        return await aio.interactions.get(id=interaction_id)
+    return await asyncio.to_thread(client.interactions.get, id=interaction_id)
+
+
+# Shared poll manager. A single background task multiplexes status checks for
+# every in-flight interaction, so N concurrent research sessions cost one poll
+# cycle per interval instead of N independent loops.
+_pending: Dict[str, asyncio.Event] = {}
+_results: Dict[str, Any] = {}
+_poller_task: Optional[asyncio.Task] = None
+
+
+async def _poller(client: genai.Client) -> None:
+    """Poll all pending interactions in one batched cycle until none remain."""
+    delay = POLL_INITIAL_DELAY
+    statuses: Dict[str, Any] = {}
+    failures: Dict[str, int] = {}
+    last_log: Dict[str, float] = {}
+    while _pending:
+        await asyncio.sleep(delay)
+        delay = min(POLL_MAX_DELAY, delay * POLL_BACKOFF_FACTOR)
+        ids = list(_pending)
+        interactions = await asyncio.gather(
+            *(_interactions_get(client, i) for i in ids),
+            return_exceptions=True,
+        )
+        for interaction_id, interaction in zip(ids, interactions):
+            if isinstance(interaction, BaseException):
+                # Transient blips (429/5xx) get retried on later cycles, which
+                # the backoff already spaces out; anything else — or too many
+                # consecutive failures — surfaces to the waiter instead of
+                # silently hammering a broken endpoint.
+                failures[interaction_id] = failures.get(interaction_id, 0) + 1
+                if _is_transient(interaction) and failures[interaction_id] < POLL_MAX_RETRIES:
+                    logger.warning(
+                        "[DEEP_RESEARCH] Transient poll failure for %s (attempt %d/%d): %s",
+                        interaction_id, failures[interaction_id], POLL_MAX_RETRIES, interaction,
+                    )
+                    continue
+                logger.error("[DEEP_RESEARCH] Giving up polling %s: %s", interaction_id, interaction)
+                statuses.pop(interaction_id, None)
+                failures.pop(interaction_id, None)
+                _results[interaction_id] = interaction
+                event = _pending.pop(interaction_id, None)
+                if event is not None:
+                    event.set()
+                continue
+            failures.pop(interaction_id, None)
+            # Only emit progress when the status actually changed or the last
+            # line for this interaction is stale; logging an identical
+            # "Polling..." every cycle just floods the pipeline.
+            now = time.monotonic()
+            if interaction.status != statuses.get(interaction_id):
+                # Re-tighten polling when any interaction changes state.
+                delay = POLL_INITIAL_DELAY
+                statuses[interaction_id] = interaction.status
+                last_log[interaction_id] = now
+                logger.info("[DEEP_RESEARCH] Polling... %s status: %s", interaction_id, interaction.status)
+            elif now - last_log.get(interaction_id, 0.0) >= POLL_LOG_INTERVAL:
+                last_log[interaction_id] = now
+                logger.info("[DEEP_RESEARCH] Polling... %s status: %s", interaction_id, interaction.status)
+            if interaction.status in _TERMINAL_STATES:
+                statuses.pop(interaction_id, None)
+                last_log.pop(interaction_id, None)
+                _results[interaction_id] = interaction
+                # Results whose waiter timed out and never resumed would
+                # otherwise pin full report texts in memory forever; evict
+                # the oldest beyond the cap (a resume re-fetches from the
+                # API, so nothing is lost).
+                while len(_results) > MAX_CACHED_RESULTS:
+                    _results.pop(next(iter(_results)))
+                event = _pending.pop(interaction_id, None)
+                if event is not None:
+                    event.set()
+
+
+async def _wait_for_completion(client: genai.Client, interaction_id: str, timeout: float):
+    """Wait for an interaction to reach a terminal state via the shared poller.
+
+    Returns the final interaction, or None if `timeout` elapsed first. On
+    timeout the ID stays registered so the poller keeps tracking it and a
+    resumed call can pick up the result immediately.
+    """
+    global _poller_task
+    if interaction_id in _results:
+        return _results.pop(interaction_id)
+    event = _pending.get(interaction_id)
+    if event is None:
+        event = asyncio.Event()
+        _pending[interaction_id] = event
+    if _poller_task is None or _poller_task.done():
+        _poller_task = asyncio.create_task(_poller(client))
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        return None
+    result = _results.pop(interaction_id, None)
+    if result is None:
+        # A concurrent waiter on the same interaction already claimed the
+        # result (or it was evicted). The interaction is terminal, so a
+        # single re-fetch recovers it.
+        result = await _interactions_get(client, interaction_id)
+    return result
+
+
 async def deep_research(query: str, interaction_id: Optional[str] = None, tool_context: ToolContext = None) -> Dict[str, Any]:
     """
     Performs deep research on a topic using Google's Deep Research API.
@@ -77,7 +241,7 @@ async def deep_research(query: str, interaction_id: Optional[str] = None, tool_c
     Returns:
         Dict with status, report text, and interaction ID.
     """
-    logger.info(f"[DEEP_RESEARCH] Starting research for query: {query[:100]}...")
+    logger.info("[DEEP_RESEARCH] Starting research for query: %.100s...", query)
 
     api_key = _get_api_key()
     if not api_key:
@@ -95,51 +259,62 @@ async def deep_research(query: str, interaction_id: Optional[str] = None, tool_c
     # Note: interaction_id is a Google API ID, no local validation needed
 
     try:
-        import time
-        # Deep Research requires AI Studio endpoint (not Vertex AI)
-        logger.info("[DEEP_RESEARCH] Creating genai client...")
-        client = genai.Client(api_key=api_key, vertexai=False, http_options={"api_version": "v1beta"})
+        client = _get_client(api_key)
 
         if interaction_id:
             # Resume polling an existing interaction
-            logger.info(f"[DEEP_RESEARCH] Resuming interaction {interaction_id}")
-            interaction = client.interactions.get(id=interaction_id)
+            logger.info("[DEEP_RESEARCH] Resuming interaction %s", interaction_id)
+            interaction = await _interactions_get(client, interaction_id)
+            if interaction_id in sessions:
+                # Refresh recency so active sessions aren't the ones evicted,
+                # and write back so the reorder lands in the state delta.
+                sessions[interaction_id] = sessions.pop(interaction_id)
+                tool_context.state["research_sessions"] = sessions
         else:
             # Create new background interaction (required for agent interactions)
             logger.info("[DEEP_RESEARCH] Creating interaction...")
-            interaction = client.interactions.create(
+            interaction = await _interactions_create(
+                client,
                 agent="deep-research-pro-preview-12-2025",
                 input=query,
                 tools=[{"type": "google_search"}],
                 background=True,
             )
-            logger.info(f"[DEEP_RESEARCH] Interaction created with ID: {interaction.id}, status: {interaction.status}")
-            # Save to session state immediately
+            logger.info("[DEEP_RESEARCH] Interaction created with ID: %s, status: %s", interaction.id, interaction.status)
+            # Save to session state immediately.
             tool_context.state["interaction_id"] = interaction.id
             sessions[interaction.id] = {"query": query}
-
-        start = time.time()
-        while interaction.status not in ("COMPLETED", "FAILED", "completed", "failed"):
-            elapsed = time.time() - start
-            if elapsed > MAX_POLL_SECONDS:
-                logger.info(f"[DEEP_RESEARCH] Poll timeout after {elapsed:.0f}s, returning in_progress")
+            # Bound the registry with LRU eviction; dict insertion order
+            # doubles as recency since resumed sessions are re-inserted.
+            while len(sessions) > MAX_RESEARCH_SESSIONS:
+                sessions.pop(next(iter(sessions)))
+            # ADK state hands out a per-invocation copy and only persists
+            # explicit assignments (they land in the state delta), so the
+            # writeback is required for the mutations to reach stored state.
+            tool_context.state["research_sessions"] = sessions
+
+        if interaction.status not in _TERMINAL_STATES:
+            final = await _wait_for_completion(client, interaction.id, MAX_POLL_SECONDS)
+            if final is None:
+                logger.info("[DEEP_RESEARCH] Poll timeout after %ss, returning in_progress", MAX_POLL_SECONDS)
                 return {
                     "status": "in_progress",
                     "message": f"Research is still in progress. Call deep_research again with interaction_id='{interaction.id}' to check for results.",
                     "current_interaction_id": interaction.id
                 }
-            time.sleep(5)
-            interaction = client.interactions.get(id=interaction.id)
-            logger.info(f"[DEEP_RESEARCH] Polling... status: {interaction.status} ({elapsed:.0f}s elapsed)")
+            if isinstance(final, BaseException):
+                # Poller gave up on a non-transient or persistent API error.
+                raise final
+            interaction = final
 
         if interaction.status in ("FAILED", "failed"):
             return {"status": "error", "message": "Deep Research interaction failed."}
 
-        logger.info(f"[DEEP_RESEARCH] Interaction completed")
+        logger.info("[DEEP_RESEARCH] Interaction completed")
 
         logger.info("[DEEP_RESEARCH] Extracting text from report...")
         report_text = _extract_text(interaction)
-        logger.info(f"[DEEP_RESEARCH] Extracted {len(report_text)} characters")
+        logger.info("[DEEP_RESEARCH] Extracted %d characters", len(report_text))
 
         return {
             "status": "success",
@@ -147,29 +322,57 @@ async def deep_research(query: str, interaction_id: Optional[str] = None, tool_c
             "current_interaction_id": interaction.id
         }
     except Exception as e:
-        logger.exception(f"[DEEP_RESEARCH] Exception occurred: {e}")
+        logger.exception("[DEEP_RESEARCH] Exception occurred: %s", e)
         return {"status": "error", "message": f"Deep Research failed: {str(e)}"}
 
 
+SESSIONS_VIEW_LIMIT = 20  # most recent sessions included in tool responses
+
+_sessions_view_cache: tuple = (None, {})
+
+
+def _sessions_view(sessions: Dict[str, Any]) -> Dict[str, str]:
+    """Compact {interaction_id: query} view of the most recent sessions.
+
+    Returning the full registry in every tool response means serializing
+    (and feeding the LLM) every session ever created. Truncate to the most
+    recent SESSIONS_VIEW_LIMIT entries and cache the view keyed by the
+    registry contents so repeated listings reuse it.
+    """
+    global _sessions_view_cache
+    key = tuple(
+        (i, s.get("query", "") if isinstance(s, dict) else str(s))
+        for i, s in sessions.items()
+    )
+    if key == _sessions_view_cache[0]:
+        return _sessions_view_cache[1]
+    view = dict(key[-SESSIONS_VIEW_LIMIT:])
+    _sessions_view_cache = (key, view)
+    return view
+
+
 def list_research_sessions(tool_context: ToolContext = None) -> Dict[str, Any]:
     """Returns a list of all active research sessions."""
     logger.info("[LIST_SESSIONS] Listing research sessions")
     sessions = tool_context.state.get("research_sessions", {})
-    logger.info(f"[LIST_SESSIONS] Found {len(sessions)} sessions")
+    logger.info("[LIST_SESSIONS] Found %d sessions", len(sessions))
     return {
         "status": "success",
-        "active_sessions": sessions
+        "total_sessions": len(sessions),
+        "active_sessions": _sessions_view(sessions)
     }
 
 
 def clear_research_session(interaction_id: str, tool_context: ToolContext = None) -> Dict[str, Any]:
     """Clears a specific research session by its interaction ID."""
-    sessions = tool_context.state.get("research_sessions", {})
-    if interaction_id in sessions:
-        del sessions[interaction_id]
-        tool_context.state["research_sessions"] = sessions
-        return {"status": "success", "message": f"Session {interaction_id} cleared."}
-    return {"status": "error", "message": f"Session {interaction_id} not found."}
+    sessions = tool_context.state.get("research_sessions")
+    if not sessions or interaction_id not in sessions:
+        return {"status": "error", "message": f"Session {interaction_id} not found."}
+    sessions.pop(interaction_id)
+    # The writeback records the change in the state delta; without it the
+    # pop only touches this invocation's copy and is never persisted.
+    tool_context.state["research_sessions"] = sessions
+    return {"status": "success", "message": f"Session {interaction_id} cleared."}
 
 
 def clear_all_research_sessions(tool_context: ToolContext = None) -> Dict[str, Any]:
@@ -187,28 +390,27 @@ def sleep_test(seconds: int) -> Dict[str, Any]:
     Returns:
         Dict with status and elapsed time.
     """
-    import time
-    logger.info(f"[SLEEP_TEST] Sleeping for {seconds} seconds...")
+    logger.info("[SLEEP_TEST] Sleeping for %d seconds...", seconds)
     start = time.time()
     time.sleep(seconds)
     elapsed = time.time() - start
-    logger.info(f"[SLEEP_TEST] Woke up after {elapsed:.1f}s")
+    logger.info("[SLEEP_TEST] Woke up after %.1fs", elapsed)
     return {"status": "success", "message": f"Slept for {elapsed:.1f} seconds. Hello!"}
 
 
-# Initialize API key and model
+# Initialize model
 logger.info("[INIT] Initializing Deep Research Agent...")
-api_key = _get_api_key()
-logger.info(f"[INIT] API key loaded: {'Yes' if api_key else 'No'}")
 model = Gemini(model="gemini-2.5-flash")
 logger.info("[INIT] Model initialized: gemini-2.5-flash")
 
 # Root agent definition
-root_agent = Agent(
-    model=model,
-    name="deep_research_assistant",
-    description="An AI research assistant powered by Google's Deep Research capability.",
-    instruction="""You are an expert research assistant powered by Google's Deep Research capability.
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", UserWarning)
+    root_agent = Agent(
+        model=model,
+        name="deep_research_assistant",
+        description="An AI research assistant powered by Google's Deep Research capability.",
+        instruction="""You are an expert research assistant powered by Google's Deep Research capability.
 
 WORKFLOW:
 1. Call 'deep_research' with the user's query. Only call this tool ONCE per turn.
@@ -222,25 +424,40 @@ RESUMING RESEARCH:
 - If the user's message contains an interaction_id or mentions resuming, call 'deep_research' with that interaction_id.
 - Call 'list_research_sessions' to see existing sessions.
 - Use 'clear_research_session' or 'clear_all_research_sessions' when asked to forget research.""",
-    tools=[deep_research, list_research_sessions, clear_research_session, clear_all_research_sessions, sleep_test]
-)
+        tools=[deep_research, list_research_sessions, clear_research_session, clear_all_research_sessions, sleep_test]
+    )
+
+
+_a2a_app = None
 
 
 def get_a2a_app():
-    """Factory function for creating A2A ASGI app. Use with: uvicorn agent:get_a2a_app --factory"""
+    """Factory function for creating A2A ASGI app. Use with: uvicorn agent:get_a2a_app --factory
+
+    The app (and the Runner plus in-memory session/artifact/memory services
+    inside it) is built once and reused, so repeated factory invocations
+    share one session store instead of allocating fresh services each time.
+    """
+    global _a2a_app
+    if _a2a_app is not None:
+        return _a2a_app
     logger.info("[A2A] Creating A2A ASGI app...")
     app_url = os.environ.get("APP_URL")
-    if app_url:
-        from urllib.parse import urlparse
-        parsed = urlparse(app_url)
-        a2a_app = to_a2a(
-            root_agent,
-            host=parsed.hostname,
-            port=parsed.port or (443 if parsed.scheme == "https" else 80),
-            protocol=parsed.scheme,
-        )
-        logger.info(f"[A2A] A2A app created with URL: {app_url}")
-    else:
-        a2a_app = to_a2a(root_agent)
-        logger.info("[A2A] A2A app created (localhost default)")
+    # to_a2a is experimental and emits UserWarnings while building the
+    # Runner/executor stack; suppress them here like the Agent construction.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        if app_url:
+            parsed = urlparse(app_url)
+            a2a_app = to_a2a(
+                root_agent,
+                host=parsed.hostname,
+                port=parsed.port or (443 if parsed.scheme == "https" else 80),
+                protocol=parsed.scheme,
+            )
+            logger.info("[A2A] A2A app created with URL: %s", app_url)
+        else:
+            a2a_app = to_a2a(root_agent)
+            logger.info("[A2A] A2A app created (localhost default)")
+    _a2a_app = a2a_app
     return a2a_app